@@ -3,7 +3,9 @@ pydom.py
 
 A fully JavaScript-like DOM wrapper in Python using BeautifulSoup.
 Supports:
-- Selection: getElementById, getElementsByClassName, getElementsByTagName, querySelector(All)
+- Parsing: Document(html), Document(html, only=...) for partial parsing
+- Selection: getElementById, getElementsByClassName, getElementsByTagName, querySelector(All),
+  querySelectorAllBatch
 - Creation: createElement
 - Traversal: parentElement, children, closest, matches, contains
 - Manipulation: appendChild, prepend, insertBefore, replaceChild, remove, cloneNode
@@ -13,9 +15,303 @@ Supports:
 - Styling: style property
 - Events: addEventListener, removeEventListener, triggerEvent
 - Shortcuts: document.body, document.head
+- Backends: BeautifulSoup (default), or lxml via Document(html, backend="lxml")
+  / use_lxml_backend()
 """
 
-from bs4 import BeautifulSoup
+import copy
+import html as _html
+import re
+import weakref
+from collections.abc import MutableSequence
+from functools import lru_cache
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+
+# Parser used for whole documents. lxml (C, libxml2) is much faster than the
+# pure-Python html.parser; install it with `pip install lxml`.
+try:
+    import lxml.html
+    _PARSER = "lxml"
+except ImportError:
+    lxml = None
+    _PARSER = "html.parser"
+
+# Tree implementation used by Document(); see use_lxml_backend()
+_BACKEND = "bs4"
+
+# Parser used for HTML fragments (innerHTML, append, insertAdjacentHTML, ...).
+# lxml wraps fragments in <html><body>, so fragments keep html.parser.
+_FRAGMENT_PARSER = "html.parser"
+
+
+# -----------------------------
+# Partial parsing
+# -----------------------------
+_STRAIN_TAG = re.compile(r"[A-Za-z][\w-]*")
+_STRAIN_ID = re.compile(r"#([\w-]+)")
+_STRAIN_CLASS = re.compile(r"\.([\w-]+)")
+
+
+def _strainer_for(only):
+    """Translate Document's `only` argument into a SoupStrainer.
+
+    Accepts a SoupStrainer, a dict of SoupStrainer keyword arguments, or a
+    simple selector: "tag", "#id", ".class" or "tag1, tag2" (also given as a
+    list of tag names). Returns None for any other selector, meaning the
+    whole document is parsed.
+    """
+    if only is None or isinstance(only, SoupStrainer):
+        return only
+    if isinstance(only, dict):
+        return SoupStrainer(**only)
+    if isinstance(only, (list, tuple)):
+        parts = list(only)
+    elif isinstance(only, str):
+        parts = only.split(",")
+    else:
+        raise TypeError("only expects a selector string, list of tag names, dict or SoupStrainer")
+    if not all(isinstance(part, str) for part in parts):
+        raise TypeError("only expects a list of tag name strings")
+    parts = [part.strip() for part in parts]
+    if parts and all(_STRAIN_TAG.fullmatch(part) for part in parts):
+        # Parsed tag names are lowercase
+        parts = [part.lower() for part in parts]
+        return SoupStrainer(parts[0] if len(parts) == 1 else parts)
+    if len(parts) == 1:
+        match = _STRAIN_ID.fullmatch(parts[0])
+        if match:
+            return SoupStrainer(id=match.group(1))
+        match = _STRAIN_CLASS.fullmatch(parts[0])
+        if match:
+            # Class attributes are still raw strings while parsing
+            token = re.escape(match.group(1))
+            return SoupStrainer(class_=re.compile(rf"(?:^|\s){token}(?:\s|$)"))
+    return None
+
+
+# -----------------------------
+# Selector cache
+# -----------------------------
+@lru_cache(maxsize=512)
+def _compile_sel(selector):
+    """Compile a CSS selector once and reuse it for repeated queries."""
+    return soupsieve.compile(selector)
+
+
+def clear_selector_cache():
+    """Drop all compiled CSS selectors."""
+    _compile_sel.cache_clear()
+
+
+def _select_batch(root, selectors, grouped):
+    selectors = list(selectors)
+    if not selectors:
+        return []
+    tags = _compile_sel(", ".join(selectors)).select(root)
+    if not grouped:
+        return [_wrap(tag) for tag in tags]
+    matchers = [_compile_sel(sel) for sel in selectors]
+    groups = [[] for _ in selectors]
+    for tag in tags:
+        for group, matcher in zip(groups, matchers):
+            if matcher.match(tag):
+                group.append(_wrap(tag))
+    return groups
+
+
+# -----------------------------
+# Element wrapper cache
+# -----------------------------
+# One Element per live tag: id(tag) -> weakref.ref(Element). Each Element
+# holds a strong reference to its tag, and hits are checked with `el.tag is
+# tag`, so a reused id never returns the wrong wrapper. This relies on
+# Element.tag never being reassigned after construction. Plain refs in a dict
+# avoid WeakValueDictionary's Python-level bookkeeping, and nothing is stored
+# on the tags, so they stay picklable. Dead refs are swept in bulk once the
+# dict doubles in size.
+_ELEMENT_REFS = {}
+_SWEEP_AT = 1024
+
+
+def _cached(tag):
+    """Return the live Element cached for `tag`, or None."""
+    ref = _ELEMENT_REFS.get(id(tag))
+    el = ref() if ref is not None else None
+    return el if el is not None and el.tag is tag else None
+
+
+def _wrap(tag):
+    """Return the cached Element for `tag`, creating it if needed."""
+    global _SWEEP_AT
+    el = _cached(tag)
+    if el is None:
+        el = Element(tag)
+        _ELEMENT_REFS[id(tag)] = weakref.ref(el)
+        if len(_ELEMENT_REFS) > _SWEEP_AT:
+            for key in [key for key, ref in _ELEMENT_REFS.items() if ref() is None]:
+                del _ELEMENT_REFS[key]
+            _SWEEP_AT = max(1024, 2 * len(_ELEMENT_REFS))
+    return el
+
+
+_POSITIONS = ("beforebegin", "afterbegin", "beforeend", "afterend")
+
+
+def _move_children(src, dest, position):
+    """Move every child of `src` to `position` relative to `dest`."""
+    # Snapshot first: src.contents shrinks as children are moved out
+    kids = list(src.contents)
+    if not kids:
+        return
+    if position == "beforeend":
+        dest.extend(kids)
+    elif position == "afterbegin":
+        for index, kid in enumerate(kids):
+            dest.insert(index, kid)
+    elif position == "beforebegin":
+        dest.insert_before(*kids)
+    elif position == "afterend":
+        dest.insert_after(*kids)
+
+
+# bs4 >= 4.13 copies a tag without its children, and gives every copy its own
+# attribute lists. Look it up on the class: on older bs4 any unknown name on a
+# tag is a child-tag lookup, so the attribute always "exists" (as None).
+_COPY_SELF = getattr(Tag, "copy_self", None)
+
+
+def _unshare_attrs(tag):
+    """Give a copied tag and its descendants their own list attributes (bs4 < 4.13 shares them)."""
+    for el in [tag, *tag.find_all(True)]:
+        for key, value in el.attrs.items():
+            if isinstance(value, list):
+                el.attrs[key] = list(value)
+
+
+# Elements whose style dict has changed but not yet been written to the tag.
+# Held weakly, so a pending style never keeps an Element (and its tree) alive;
+# an Element collected first writes its style out through its finalizer.
+_DIRTY_STYLES = weakref.WeakSet()
+
+
+def _write_style(tag, style):
+    tag["style"] = "; ".join([f"{k}: {v}" for k, v in style.items()])
+
+
+def _flush_styles():
+    """Write pending style changes to their tags before the tree is read."""
+    while _DIRTY_STYLES:
+        _DIRTY_STYLES.pop()._flush_style()
+
+
+# Live Documents keyed by id(soup), so a mutation can find the Documents that
+# own its tree (copy.copy of a Document shares the soup)
+_DOCUMENTS = {}
+
+
+def _register_document(doc):
+    soup = doc._soup
+    docs = _DOCUMENTS.get(id(soup))
+    if docs is None:
+        docs = _DOCUMENTS[id(soup)] = weakref.WeakSet()
+        weakref.finalize(soup, _DOCUMENTS.pop, id(soup), None)
+    docs.add(doc)
+
+
+def _invalidate(*tags, structural=False):
+    """Drop cached innerHTML for each tag and every ancestor of it.
+
+    Pass structural=True when tags may be added, removed or moved, or an id
+    changes; that also drops the id and tag indexes of the Documents the tags
+    belong to. Only mutations made
+    through Element/Document are tracked; editing the underlying tags
+    directly bypasses the caches.
+    """
+    for tag in tags:
+        root = None
+        while tag is not None:
+            el = _cached(tag)
+            if el is not None:
+                el._inner_html_cache = None
+            root, tag = tag, tag.parent
+        if structural and root is not None:
+            for doc in _DOCUMENTS.get(id(root), ()):
+                if doc._soup is root:
+                    doc._id_cache = None
+                    doc._tag_index = None
+
+
+# -----------------------------
+# classList view
+# -----------------------------
+def _class_reader(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args):
+        return method(self._element._classes(), *args)
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+def _class_editor(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        classes = self._element._classes(create=True)
+        result = method(classes, *args, **kwargs)
+        self._element._write_classes(classes)
+        return result
+
+    wrapper.__name__ = name
+    return wrapper
+
+
+class _ClassList(MutableSequence):
+    """Live view of an element's classes returned by classList.
+
+    Every operation reads the element's current classes, and every edit is
+    written back to the element, so a view kept across other mutations
+    (addClass, setAttribute, ...) never goes stale.
+    """
+
+    __slots__ = ("_element",)
+
+    def __init__(self, element):
+        self._element = element
+
+    __len__ = _class_reader("__len__")
+    __getitem__ = _class_reader("__getitem__")
+    __iter__ = _class_reader("__iter__")
+    __contains__ = _class_reader("__contains__")
+    __reversed__ = _class_reader("__reversed__")
+    index = _class_reader("index")
+    count = _class_reader("count")
+    copy = _class_reader("copy")
+
+    __setitem__ = _class_editor("__setitem__")
+    __delitem__ = _class_editor("__delitem__")
+    insert = _class_editor("insert")
+    append = _class_editor("append")
+    extend = _class_editor("extend")
+    remove = _class_editor("remove")
+    pop = _class_editor("pop")
+    clear = _class_editor("clear")
+    sort = _class_editor("sort")
+    reverse = _class_editor("reverse")
+
+    def __eq__(self, other):
+        if isinstance(other, _ClassList):
+            other = list(other)
+        return self._element._classes() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._element._classes())
+
 
 # -----------------------------
 # Element class
@@ -25,25 +321,50 @@ class Element:
         self.tag = tag
         self._events = {}
 
-        # Initialize style dictionary
-        self._style = {}
-        if tag.has_attr("style"):
-            for s in tag["style"].split(";"):
-                if s.strip():
-                    key, value = s.split(":")
-                    self._style[key.strip()] = value.strip()
+        # Style dictionary, parsed from the style attribute on first access
+        self._style = None
+        # weakref.finalize that writes _style to the tag, while a write is pending
+        self._style_pending = None
+
+        # Rendered innerHTML, cleared by _invalidate() on mutation
+        self._inner_html_cache = None
+
+        # Live classList view, created on first access
+        self._class_list = None
+
+    def _parse_style(self):
+        style = {}
+        s = self.tag.attrs.get("style")
+        if s:
+            for item in s.split(";"):
+                if item.strip():
+                    # partition, not split: values may contain colons (url(http://...))
+                    key, _, value = item.partition(":")
+                    style[key.strip()] = value.strip()
+        return style
+
+    def _flush_style(self):
+        if self._style_pending is not None:
+            self._style_pending()
+            self._style_pending = None
 
     # ----------------- innerHTML / textContent -----------------
     @property
     def innerHTML(self):
-        return "".join(str(child) for child in self.tag.contents)
+        if self._inner_html_cache is not None:
+            return self._inner_html_cache
+        _flush_styles()
+        html = "".join(map(str, self.tag.contents))
+        # Only the cached wrapper is reached by _invalidate(), so only it may cache
+        if _cached(self.tag) is self:
+            self._inner_html_cache = html
+        return html
 
     @innerHTML.setter
     def innerHTML(self, html_str):
+        _invalidate(self.tag, structural=True)
         self.tag.clear()
-        new_content = BeautifulSoup(html_str, "html.parser")
-        for child in new_content.contents:
-            self.tag.append(child)
+        _move_children(BeautifulSoup(html_str, _FRAGMENT_PARSER), self.tag, "beforeend")
 
     @property
     def textContent(self):
@@ -51,109 +372,186 @@ class Element:
 
     @textContent.setter
     def textContent(self, text_str):
+        _invalidate(self.tag, structural=True)
         self.tag.clear()
         self.tag.append(text_str)
 
     # ----------------- classList -----------------
+    def _classes(self, create=False):
+        """Return the tag's own class list; addClass/removeClass edit it in place."""
+        classes = self.tag.get("class")
+        if isinstance(classes, str):
+            # Set as a plain string, e.g. setAttribute("class", "a b"). Storing
+            # the token list serializes the same, so nothing is invalidated.
+            classes = classes.split()
+            self.tag['class'] = classes
+        elif classes is None:
+            classes = []
+            if create:
+                self.tag['class'] = classes
+        return classes
+
+    def _write_classes(self, classes):
+        # `classes` came from _classes(create=True) and was edited in place
+        _invalidate(self.tag)
+        if not classes:
+            self.tag.attrs.pop('class', None)
+
     @property
     def classList(self):
-        return self.tag.get("class", [])
+        if self._class_list is None:
+            self._class_list = _ClassList(self)
+        return self._class_list
 
     def addClass(self, cls):
-        classes = self.tag.get("class", [])
+        classes = self._classes(create=True)
         if cls not in classes:
+            _invalidate(self.tag)
             classes.append(cls)
-            self.tag['class'] = classes
 
     def removeClass(self, cls):
-        classes = self.tag.get("class", [])
+        classes = self._classes()
         if cls in classes:
+            _invalidate(self.tag)
             classes.remove(cls)
-            if classes:
-                self.tag['class'] = classes
-            else:
+            if not classes:
                 del self.tag['class']
 
     # ----------------- parent / children -----------------
     @property
     def parentElement(self):
         parent = self.tag.parent
-        return Element(parent) if parent else None
+        return _wrap(parent) if parent else None
 
     @property
     def children(self):
-        return [Element(child) for child in self.tag.find_all(recursive=False)]
+        return [_wrap(child) for child in self.tag.children if isinstance(child, Tag)]
 
     # ----------------- remove -----------------
     def remove(self):
+        _invalidate(self.tag, structural=True)
         self.tag.decompose()
 
     # ----------------- get/set attribute -----------------
     def getAttribute(self, attr):
+        _flush_styles()
         return self.tag.get(attr)
 
     def setAttribute(self, attr, value):
+        _invalidate(self.tag, structural=(attr == "id"))
         self.tag[attr] = value
+        if attr == "style":
+            self._style = None
+            if self._style_pending is not None:
+                self._style_pending.detach()
+                self._style_pending = None
+                _DIRTY_STYLES.discard(self)
 
     # ----------------- querySelector / querySelectorAll -----------------
     def querySelector(self, selector):
-        el = self.tag.select_one(selector)
-        return Element(el) if el else None
+        _flush_styles()
+        el = _compile_sel(selector).select_one(self.tag)
+        return _wrap(el) if el else None
 
     def querySelectorAll(self, selector):
-        return [Element(el) for el in self.tag.select(selector)]
+        if selector == "*":
+            return [_wrap(el) for el in self.tag.descendants if isinstance(el, Tag)]
+        _flush_styles()
+        return [_wrap(el) for el in _compile_sel(selector).select(self.tag)]
+
+    def querySelectorAllBatch(self, selectors, grouped=False):
+        """Run several selectors in a single traversal.
+
+        Results are in document order, each element appearing once. With
+        grouped=True, returns one list per selector instead.
+        """
+        _flush_styles()
+        return _select_batch(self.tag, selectors, grouped)
 
     # ----------------- style -----------------
     @property
     def style(self):
+        if self._style is None:
+            self._style = self._parse_style()
         return self._style
 
     @style.setter
     def style(self, style_dict):
-        self._style.update(style_dict)
-        self.tag["style"] = "; ".join(f"{k}: {v}" for k, v in self._style.items())
+        # The attribute string is rebuilt once, on the next read of the tree
+        _invalidate(self.tag)
+        self.style.update(style_dict)
+        if self._style_pending is None:
+            self._style_pending = weakref.finalize(self, _write_style, self.tag, self._style)
+            self._style_pending.atexit = False
+            _DIRTY_STYLES.add(self)
 
     # ----------------- event listeners -----------------
+    # Listeners are stored per event in an insertion-ordered dict keyed by the
+    # callback itself, so removal is O(1). Keying by value (not id) keeps
+    # bound methods removable, since each attribute access builds a new one.
+    # Unhashable callbacks (__eq__ without __hash__) are keyed by id() and
+    # found by an == scan instead.
     def addEventListener(self, event, callback):
-        if event not in self._events:
-            self._events[event] = []
-        self._events[event].append(callback)
+        listeners = self._events.setdefault(event, {})
+        try:
+            listeners[callback] = callback
+        except TypeError:
+            if not any(cb == callback for cb in listeners.values()):
+                listeners[id(callback)] = callback
 
     def removeEventListener(self, event, callback):
-        if event in self._events:
-            self._events[event] = [cb for cb in self._events[event] if cb != callback]
+        listeners = self._events.get(event, {})
+        try:
+            listeners.pop(callback, None)
+        except TypeError:
+            for key, cb in listeners.items():
+                if cb == callback:
+                    del listeners[key]
+                    break
 
     def triggerEvent(self, event, *args, **kwargs):
         if event in self._events:
-            for callback in self._events[event]:
+            # Copy so listeners can add/remove listeners while being dispatched
+            for callback in list(self._events[event].values()):
                 callback(*args, **kwargs)
 
     # ----------------- matches / closest / contains -----------------
     def matches(self, selector):
-        return bool(self.tag.select_one(f":scope{selector}"))
+        _flush_styles()
+        return _compile_sel(selector).match(self.tag)
 
     def closest(self, selector):
-        el = self
-        while el is not None:
-            if el.matches(selector):
-                return el
-            el = el.parentElement
+        _flush_styles()
+        matcher = _compile_sel(selector)
+        if matcher.match(self.tag):
+            return self
+        for tag in self.tag.parents:
+            if matcher.match(tag):
+                return _wrap(tag)
         return None
 
     def contains(self, other_element):
         if not isinstance(other_element, Element):
             raise TypeError("contains expects an Element instance")
-        return other_element.tag in self.tag.descendants
+        target = self.tag
+        tag = other_element.tag.parent
+        while tag is not None:
+            if tag is target:
+                return True
+            tag = tag.parent
+        return False
 
     # ----------------- appendChild / prepend / insertBefore / replaceChild -----------------
     def appendChild(self, child):
         if isinstance(child, Element):
+            _invalidate(self.tag, child.tag.parent, structural=True)
             self.tag.append(child.tag)
         else:
             raise TypeError("appendChild expects an Element instance")
 
     def prepend(self, child):
         if isinstance(child, Element):
+            _invalidate(self.tag, child.tag.parent, structural=True)
             if self.tag.contents:
                 self.tag.insert(0, child.tag)
             else:
@@ -164,71 +562,66 @@ class Element:
     def insertBefore(self, new_child, reference_child):
         if not isinstance(new_child, Element) or not isinstance(reference_child, Element):
             raise TypeError("insertBefore expects Element instances")
-        index = self.tag.contents.index(reference_child.tag)
-        self.tag.insert(index, new_child.tag)
+        if reference_child.tag.parent is not self.tag:
+            raise ValueError("insertBefore reference is not a child of this element")
+        _invalidate(self.tag, new_child.tag.parent, structural=True)
+        reference_child.tag.insert_before(new_child.tag)
 
     def replaceChild(self, new_child, old_child):
         if not isinstance(new_child, Element) or not isinstance(old_child, Element):
             raise TypeError("replaceChild expects Element instances")
-        index = self.tag.contents.index(old_child.tag)
-        self.tag.contents[index] = new_child.tag
+        if old_child.tag.parent is not self.tag:
+            raise ValueError("replaceChild target is not a child of this element")
+        _invalidate(self.tag, new_child.tag.parent, structural=True)
+        old_child.tag.replace_with(new_child.tag)
 
     # ----------------- cloneNode -----------------
     def cloneNode(self, deep=True):
-        html_str = str(self.tag)
-        if not deep:
-            temp_soup = BeautifulSoup(html_str, "html.parser")
-            temp_tag = temp_soup.find(self.tag.name)
-            temp_tag.clear()
+        _flush_styles()
+        if _COPY_SELF is not None:
+            new_tag = copy.deepcopy(self.tag) if deep else _COPY_SELF(self.tag)
         else:
-            temp_tag = BeautifulSoup(html_str, "html.parser").find(self.tag.name)
-        return Element(temp_tag)
+            new_tag = copy.deepcopy(self.tag)
+            if not deep:
+                new_tag.clear()
+            _unshare_attrs(new_tag)
+        return _wrap(new_tag)
 
     # ----------------- append / prependText convenience -----------------
     def append(self, content):
         if isinstance(content, Element):
+            _invalidate(self.tag, content.tag.parent, structural=True)
             self.tag.append(content.tag)
         elif isinstance(content, str):
-            new_content = BeautifulSoup(content, "html.parser")
-            for child in new_content.contents:
-                self.tag.append(child)
+            _invalidate(self.tag, structural=True)
+            _move_children(BeautifulSoup(content, _FRAGMENT_PARSER), self.tag, "beforeend")
         else:
             raise TypeError("append expects Element or HTML string")
 
     def prependText(self, content):
         if isinstance(content, Element):
+            _invalidate(self.tag, content.tag.parent, structural=True)
             if self.tag.contents:
                 self.tag.insert(0, content.tag)
             else:
                 self.tag.append(content.tag)
         elif isinstance(content, str):
-            new_content = BeautifulSoup(content, "html.parser")
-            for child in reversed(new_content.contents):
-                self.tag.insert(0, child)
+            _invalidate(self.tag, structural=True)
+            _move_children(BeautifulSoup(content, _FRAGMENT_PARSER), self.tag, "afterbegin")
         else:
             raise TypeError("prepend expects Element or HTML string")
 
     # ----------------- insertAdjacentHTML / insertAdjacentElement -----------------
     def insertAdjacentHTML(self, position, html_str):
-        new_content = BeautifulSoup(html_str, "html.parser")
-        if position == "beforebegin":
-            for child in reversed(new_content.contents):
-                self.tag.insert_before(child)
-        elif position == "afterbegin":
-            for child in reversed(new_content.contents):
-                self.tag.insert(0, child)
-        elif position == "beforeend":
-            for child in new_content.contents:
-                self.tag.append(child)
-        elif position == "afterend":
-            for child in new_content.contents:
-                self.tag.insert_after(child)
-        else:
+        if position not in _POSITIONS:
             raise ValueError("Invalid position for insertAdjacentHTML")
+        _invalidate(self.tag, structural=True)
+        _move_children(BeautifulSoup(html_str, _FRAGMENT_PARSER), self.tag, position)
 
     def insertAdjacentElement(self, position, element):
         if not isinstance(element, Element):
             raise TypeError("insertAdjacentElement expects an Element instance")
+        _invalidate(self.tag, element.tag.parent, structural=True)
         if position == "beforebegin":
             self.tag.insert_before(element.tag)
         elif position == "afterbegin":
@@ -245,42 +638,121 @@ class Element:
 # Document class
 # -----------------------------
 class Document:
-    def __init__(self, html):
-        self.soup = BeautifulSoup(html, "html.parser")
+    def __new__(cls, html=None, only=None, backend=None):
+        # copy and pickle call __new__ without arguments; keep them on bs4
+        if html is None:
+            return super().__new__(cls)
+        backend = backend or _BACKEND
+        if backend == "lxml":
+            if only is not None:
+                raise ValueError("only= is not supported by the lxml backend")
+            return LxmlDocument(html)
+        if backend != "bs4":
+            raise ValueError(f"Unknown backend: {backend!r}")
+        return super().__new__(cls)
+
+    def __init__(self, html, only=None, backend=None):
+        """Parse `html`. Pass `only` to keep just the matching elements (see _strainer_for)."""
+        strainer = _strainer_for(only)
+        if strainer is None:
+            self._soup = BeautifulSoup(html, _PARSER)
+        else:
+            self._soup = BeautifulSoup(html, _PARSER, parse_only=strainer)
+
+        # id -> first tag with that id, built on first getElementById and
+        # dropped by structural mutations
+        self._id_cache = None
+
+        # tag name -> tags in document order, built on first getElementsByTagName
+        # and dropped by structural mutations
+        self._tag_index = None
+        _register_document(self)
+
+    def __getstate__(self):
+        # The lookup caches hold tags, which come back as new objects after
+        # pickling; they are rebuilt on demand
+        state = dict(self.__dict__)
+        state["_id_cache"] = None
+        state["_tag_index"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _register_document(self)
+
+    @property
+    def soup(self):
+        _flush_styles()
+        return self._soup
+
+    @soup.setter
+    def soup(self, soup):
+        self._soup = soup
+        self._id_cache = None
+        self._tag_index = None
+        _register_document(self)
+
+    def _build_id_cache(self):
+        id_cache = {}
+        for tag in self.soup.find_all(id=True):
+            id_cache.setdefault(tag["id"], tag)
+        self._id_cache = id_cache
+
+    def _build_tag_index(self):
+        tag_index = {}
+        for tag in self.soup.find_all(True):
+            tag_index.setdefault(tag.name, []).append(tag)
+        self._tag_index = tag_index
 
     # DOM selection
     def getElementById(self, element_id):
-        tag = self.soup.find(id=element_id)
-        return Element(tag) if tag else None
+        if self._id_cache is None:
+            self._build_id_cache()
+        tag = self._id_cache.get(element_id)
+        return _wrap(tag) if tag else None
 
     def getElementsByClassName(self, class_name):
-        return [Element(tag) for tag in self.soup.find_all(class_=class_name)]
+        return [_wrap(tag) for tag in self.soup.find_all(class_=class_name)]
 
     def getElementsByTagName(self, tag_name):
-        return [Element(tag) for tag in self.soup.find_all(tag_name)]
+        if tag_name == "*":
+            return [_wrap(tag) for tag in self.soup.descendants if isinstance(tag, Tag)]
+        if not isinstance(tag_name, str):
+            return [_wrap(tag) for tag in self.soup.find_all(tag_name)]
+        if self._tag_index is None:
+            self._build_tag_index()
+        return [_wrap(tag) for tag in self._tag_index.get(tag_name, ())]
 
     def querySelector(self, selector):
-        tag = self.soup.select_one(selector)
-        return Element(tag) if tag else None
+        tag = _compile_sel(selector).select_one(self.soup)
+        return _wrap(tag) if tag else None
 
     def querySelectorAll(self, selector):
-        return [Element(tag) for tag in self.soup.select(selector)]
+        return [_wrap(tag) for tag in _compile_sel(selector).select(self.soup)]
+
+    def querySelectorAllBatch(self, selectors, grouped=False):
+        """Run several selectors in a single traversal.
+
+        Results are in document order, each element appearing once. With
+        grouped=True, returns one list per selector instead.
+        """
+        return _select_batch(self.soup, selectors, grouped)
 
     # Create new element
     def createElement(self, tag_name):
         tag = self.soup.new_tag(tag_name)
-        return Element(tag)
+        return _wrap(tag)
 
     # JS-like shortcuts
     @property
     def body(self):
         tag = self.soup.body
-        return Element(tag) if tag else None
+        return _wrap(tag) if tag else None
 
     @property
     def head(self):
         tag = self.soup.head
-        return Element(tag) if tag else None
+        return _wrap(tag) if tag else None
 
         # ----------------- document.title -----------------
     @property
@@ -290,6 +762,7 @@ class Document:
 
     @title.setter
     def title(self, value):
+        _invalidate(self.soup.title or self.soup.head or self.soup.html or self.soup, structural=True)
         if self.soup.title:
             self.soup.title.string = value
         else:
@@ -307,7 +780,7 @@ class Document:
 
     # ----------------- getElementsByName -----------------
     def getElementsByName(self, name):
-        return [Element(tag) for tag in self.soup.find_all(attrs={"name": name})]
+        return [_wrap(tag) for tag in self.soup.find_all(attrs={"name": name})]
     
     # ----------------- document.write -----------------
     def write(self, html_str):
@@ -324,10 +797,482 @@ class Document:
                 self.soup.append(html_tag)
 
         # Clear existing body content
+        _invalidate(self.soup.body, structural=True)
         self.soup.body.clear()
 
         # Parse new HTML and insert
-        new_content = BeautifulSoup(html_str, "html.parser")
-        for child in new_content.contents:
-            self.soup.body.append(child)
+        _move_children(BeautifulSoup(html_str, _FRAGMENT_PARSER), self.soup.body, "beforeend")
+
+
+# -----------------------------
+# lxml backend
+# -----------------------------
+def use_lxml_backend(enabled=True):
+    """Make Document() build LxmlDocument trees by default (needs lxml and cssselect)."""
+    global _BACKEND
+    _BACKEND = "lxml" if enabled else "bs4"
+
+
+def _require_lxml():
+    if lxml is None:
+        raise ImportError("The lxml backend requires lxml: pip install lxml cssselect")
+
+
+# XPath prefixes for _lx_compile_sel: test the node itself, search below it,
+# or search a whole document including its root element
+_LX_SELF = "self::"
+_LX_DESCENDANTS = "descendant::"
+_LX_DOCUMENT = "descendant-or-self::"
+
+
+@lru_cache(maxsize=None)
+def _lx_translator():
+    """Build the cssselect translator used by the lxml backend.
+
+    Stock cssselect walks down from the context node ("div p" becomes
+    "div/descendant::p"), so it can't test a node on its own. Here the
+    combinators become predicates on the right-hand node ("p[ancestor::div]").
+    The same expression can then test a node (self::) or search its
+    descendants, with ancestors outside the context still counted, as in
+    soupsieve.
+    """
+    from cssselect import HTMLTranslator
+    from cssselect.xpath import XPathExpr
+
+    class _Expr(XPathExpr):
+        def add_star_prefix(self):
+            # Paths stay empty; structure lives in predicates only
+            pass
+
+    class _Translator(HTMLTranslator):
+        xpathexpr_cls = _Expr
+
+        def xpath_descendant_combinator(self, left, right):
+            return right.add_condition(f"ancestor::{left}")
+
+        def xpath_child_combinator(self, left, right):
+            return right.add_condition(f"parent::{left}")
+
+        def xpath_direct_adjacent_combinator(self, left, right):
+            return right.add_condition(f"preceding-sibling::*[1]/self::{left}")
+
+        def xpath_indirect_adjacent_combinator(self, left, right):
+            return right.add_condition(f"preceding-sibling::{left}")
+
+    return _Translator()
+
+
+@lru_cache(maxsize=512)
+def _lx_compile_sel(selector, prefix):
+    """Translate a CSS selector to a compiled XPath once and reuse it."""
+    return lxml.etree.XPath(_lx_translator().css_to_xpath(selector, prefix=prefix))
+
+
+def _lx_parse_fragment(html_str):
+    # Leading text comes back as a str; everything else is an element whose
+    # tail carries the text that followed it
+    return lxml.html.fragments_fromstring(html_str) if html_str else []
+
+
+def _lx_detach(el):
+    """Remove `el` from its parent, leaving its tail text in the document."""
+    parent = el.getparent()
+    if parent is None:
+        return
+    if el.tail:
+        previous = el.getprevious()
+        if previous is None:
+            parent.text = (parent.text or "") + el.tail
+        else:
+            previous.tail = (previous.tail or "") + el.tail
+    el.tail = None
+    parent.remove(el)
+
+
+def _lx_insert(ref, position, nodes):
+    """Insert `nodes` (elements and strings) at `position` relative to `ref`."""
+    if position in ("beforeend", "afterbegin"):
+        parent = ref
+        index = len(ref) if position == "beforeend" else 0
+    else:
+        parent = ref.getparent()
+        if parent is None:
+            raise ValueError(f"Cannot insert {position} an element without a parent")
+        index = parent.index(ref) + (position == "afterend")
+
+    # Text already sitting in the slot stays in front for beforeend/beforebegin
+    # and moves behind the inserted nodes for afterbegin/afterend
+    last = parent[index - 1] if index else None
+    trailing = None
+    if position in ("afterbegin", "afterend"):
+        if last is None:
+            trailing, parent.text = parent.text, None
+        else:
+            trailing, last.tail = last.tail, None
+
+    def add_text(text):
+        if last is None:
+            parent.text = (parent.text or "") + text
+        else:
+            last.tail = (last.tail or "") + text
+
+    for node in nodes:
+        if isinstance(node, str):
+            add_text(node)
+        else:
+            parent.insert(index, node)
+            index += 1
+            last = node
+    if trailing:
+        add_text(trailing)
+
+
+# Elements whose content is raw text and is serialized without escaping
+_LX_RAW_TEXT = frozenset(["script", "style"])
+
+_LXML_CACHE = weakref.WeakValueDictionary()
+
+
+def _lx_wrap(el):
+    """Return the cached LxmlElement for `el`, creating it if needed."""
+    wrapper = _LXML_CACHE.get(id(el))
+    if wrapper is None or wrapper.tag is not el:
+        wrapper = LxmlElement(el)
+        _LXML_CACHE[id(el)] = wrapper
+    return wrapper
+
+
+class LxmlElement:
+    """Element with the same API as Element, backed by an lxml.html element."""
+
+    def __init__(self, tag):
+        self.tag = tag
+        self._events = {}
+        self._style = None
+
+    # ----------------- innerHTML / textContent -----------------
+    @property
+    def innerHTML(self):
+        text = self.tag.text or ""
+        if text and self.tag.tag not in _LX_RAW_TEXT:
+            text = _html.escape(text, quote=False)
+        return text + "".join(
+            [lxml.html.tostring(child, encoding="unicode") for child in self.tag]
+        )
+
+    @innerHTML.setter
+    def innerHTML(self, html_str):
+        for child in list(self.tag):
+            self.tag.remove(child)
+        self.tag.text = None
+        _lx_insert(self.tag, "beforeend", _lx_parse_fragment(html_str))
+
+    @property
+    def textContent(self):
+        return self.tag.text_content()
+
+    @textContent.setter
+    def textContent(self, text_str):
+        for child in list(self.tag):
+            self.tag.remove(child)
+        self.tag.text = text_str
+
+    # ----------------- classList -----------------
+    def _classes(self, create=False):
+        return self.tag.get("class", "").split()
+
+    def _write_classes(self, classes):
+        if classes:
+            self.tag.set("class", " ".join(classes))
+        else:
+            self.tag.attrib.pop("class", None)
+
+    @property
+    def classList(self):
+        return _ClassList(self)
+
+    def addClass(self, cls):
+        classes = self._classes()
+        if cls not in classes:
+            classes.append(cls)
+            self._write_classes(classes)
+
+    def removeClass(self, cls):
+        classes = self._classes()
+        if cls in classes:
+            classes.remove(cls)
+            self._write_classes(classes)
+
+    # ----------------- parent / children -----------------
+    @property
+    def parentElement(self):
+        parent = self.tag.getparent()
+        return _lx_wrap(parent) if parent is not None else None
+
+    @property
+    def children(self):
+        # Comments and processing instructions have a non-str tag
+        return [_lx_wrap(child) for child in self.tag if isinstance(child.tag, str)]
+
+    # ----------------- remove -----------------
+    def remove(self):
+        _lx_detach(self.tag)
+
+    # ----------------- get/set attribute -----------------
+    def getAttribute(self, attr):
+        return self.tag.get(attr)
+
+    def setAttribute(self, attr, value):
+        self.tag.set(attr, value)
+        if attr == "style":
+            self._style = None
+
+    # ----------------- querySelector / querySelectorAll -----------------
+    def querySelector(self, selector):
+        found = _lx_compile_sel(selector, _LX_DESCENDANTS)(self.tag)
+        return _lx_wrap(found[0]) if found else None
+
+    def querySelectorAll(self, selector):
+        return [_lx_wrap(el) for el in _lx_compile_sel(selector, _LX_DESCENDANTS)(self.tag)]
+
+    def querySelectorAllBatch(self, selectors, grouped=False):
+        """Run several selectors in a single traversal; see Element.querySelectorAllBatch."""
+        return _lx_select_batch(self.tag, _LX_DESCENDANTS, selectors, grouped)
+
+    # ----------------- style -----------------
+    @property
+    def style(self):
+        if self._style is None:
+            self._style = {}
+            for item in (self.tag.get("style") or "").split(";"):
+                if item.strip():
+                    key, _, value = item.partition(":")
+                    self._style[key.strip()] = value.strip()
+        return self._style
+
+    @style.setter
+    def style(self, style_dict):
+        self.style.update(style_dict)
+        self.tag.set("style", "; ".join([f"{k}: {v}" for k, v in self._style.items()]))
+
+    # ----------------- event listeners -----------------
+    addEventListener = Element.addEventListener
+    removeEventListener = Element.removeEventListener
+    triggerEvent = Element.triggerEvent
+
+    # ----------------- matches / closest / contains -----------------
+    def matches(self, selector):
+        return bool(_lx_compile_sel(selector, _LX_SELF)(self.tag))
+
+    def closest(self, selector):
+        matcher = _lx_compile_sel(selector, _LX_SELF)
+        if matcher(self.tag):
+            return self
+        for el in self.tag.iterancestors():
+            if matcher(el):
+                return _lx_wrap(el)
+        return None
+
+    def contains(self, other_element):
+        if not isinstance(other_element, LxmlElement):
+            raise TypeError("contains expects an LxmlElement instance")
+        return any(el is self.tag for el in other_element.tag.iterancestors())
+
+    # ----------------- appendChild / prepend / insertBefore / replaceChild -----------------
+    def appendChild(self, child):
+        if not isinstance(child, LxmlElement):
+            raise TypeError("appendChild expects an LxmlElement instance")
+        _lx_detach(child.tag)
+        _lx_insert(self.tag, "beforeend", [child.tag])
+
+    def prepend(self, child):
+        if not isinstance(child, LxmlElement):
+            raise TypeError("prepend expects an LxmlElement instance")
+        _lx_detach(child.tag)
+        _lx_insert(self.tag, "afterbegin", [child.tag])
+
+    def insertBefore(self, new_child, reference_child):
+        if not isinstance(new_child, LxmlElement) or not isinstance(reference_child, LxmlElement):
+            raise TypeError("insertBefore expects LxmlElement instances")
+        if reference_child.tag.getparent() is not self.tag:
+            raise ValueError("insertBefore reference is not a child of this element")
+        _lx_detach(new_child.tag)
+        reference_child.tag.addprevious(new_child.tag)
+
+    def replaceChild(self, new_child, old_child):
+        if not isinstance(new_child, LxmlElement) or not isinstance(old_child, LxmlElement):
+            raise TypeError("replaceChild expects LxmlElement instances")
+        if old_child.tag.getparent() is not self.tag:
+            raise ValueError("replaceChild target is not a child of this element")
+        _lx_detach(new_child.tag)
+        # The text after old_child belongs to the document, not to old_child
+        new_child.tag.tail, old_child.tag.tail = old_child.tag.tail, None
+        self.tag.replace(old_child.tag, new_child.tag)
+
+    # ----------------- cloneNode -----------------
+    def cloneNode(self, deep=True):
+        if deep:
+            new_tag = copy.deepcopy(self.tag)
+            new_tag.tail = None
+        else:
+            new_tag = self.tag.makeelement(self.tag.tag, dict(self.tag.attrib))
+        return _lx_wrap(new_tag)
+
+    # ----------------- append / prependText convenience -----------------
+    def append(self, content):
+        if isinstance(content, LxmlElement):
+            self.appendChild(content)
+        elif isinstance(content, str):
+            _lx_insert(self.tag, "beforeend", _lx_parse_fragment(content))
+        else:
+            raise TypeError("append expects LxmlElement or HTML string")
+
+    def prependText(self, content):
+        if isinstance(content, LxmlElement):
+            self.prepend(content)
+        elif isinstance(content, str):
+            _lx_insert(self.tag, "afterbegin", _lx_parse_fragment(content))
+        else:
+            raise TypeError("prepend expects LxmlElement or HTML string")
+
+    # ----------------- insertAdjacentHTML / insertAdjacentElement -----------------
+    def insertAdjacentHTML(self, position, html_str):
+        if position not in _POSITIONS:
+            raise ValueError("Invalid position for insertAdjacentHTML")
+        _lx_insert(self.tag, position, _lx_parse_fragment(html_str))
+
+    def insertAdjacentElement(self, position, element):
+        if not isinstance(element, LxmlElement):
+            raise TypeError("insertAdjacentElement expects an LxmlElement instance")
+        if position not in _POSITIONS:
+            raise ValueError("Invalid position for insertAdjacentElement")
+        _lx_detach(element.tag)
+        _lx_insert(self.tag, position, [element.tag])
+
+
+def _lx_select_batch(root, prefix, selectors, grouped):
+    selectors = list(selectors)
+    if not selectors:
+        return []
+    els = _lx_compile_sel(", ".join(selectors), prefix)(root)
+    if not grouped:
+        return [_lx_wrap(el) for el in els]
+    matchers = [_lx_compile_sel(sel, _LX_SELF) for sel in selectors]
+    groups = [[] for _ in selectors]
+    for el in els:
+        for group, matcher in zip(groups, matchers):
+            if matcher(el):
+                group.append(_lx_wrap(el))
+    return groups
+
+
+# An XML declaration with an encoding, as lxml detects it at the start of a str
+_LX_ENCODING_DECL = re.compile(r"<\?xml[^>]+\sencoding\s*=")
+
+
+@lru_cache(maxsize=None)
+def _lx_utf8_parser():
+    return lxml.html.HTMLParser(encoding="utf-8")
+
+
+class LxmlDocument:
+    """Document with the same API as Document, backed by lxml.html.
+
+    Build one with Document(html, backend="lxml") or after use_lxml_backend().
+    CSS selectors are translated to XPath by cssselect and match like
+    soupsieve does on the bs4 backend.
+    """
+
+    def __init__(self, html):
+        _require_lxml()
+        parser = None
+        if isinstance(html, str) and _LX_ENCODING_DECL.match(html):
+            # lxml refuses str with an encoding declaration; the text is
+            # already decoded, so parse it as UTF-8 whatever it declares
+            html = html.encode("utf-8")
+            parser = _lx_utf8_parser()
+        try:
+            self.root = lxml.html.document_fromstring(html, parser=parser)
+        except lxml.etree.ParserError:
+            # No elements at all (empty, whitespace, only comments), which
+            # bs4 accepts; start from an empty <html> instead
+            self.root = lxml.html.Element("html")
+
+    # DOM selection
+    def getElementById(self, element_id):
+        found = self.root.xpath("//*[@id=$i]", i=element_id)
+        return _lx_wrap(found[0]) if found else None
+
+    def getElementsByClassName(self, class_name):
+        found = self.root.xpath(
+            "//*[contains(concat(' ', normalize-space(@class), ' '), concat(' ', $c, ' '))]",
+            c=class_name,
+        )
+        return [_lx_wrap(el) for el in found]
+
+    def getElementsByTagName(self, tag_name):
+        if tag_name == "*":
+            return [_lx_wrap(el) for el in self.root.iter() if isinstance(el.tag, str)]
+        return [_lx_wrap(el) for el in self.root.iter(tag_name)]
+
+    def querySelector(self, selector):
+        found = _lx_compile_sel(selector, _LX_DOCUMENT)(self.root)
+        return _lx_wrap(found[0]) if found else None
+
+    def querySelectorAll(self, selector):
+        return [_lx_wrap(el) for el in _lx_compile_sel(selector, _LX_DOCUMENT)(self.root)]
+
+    def querySelectorAllBatch(self, selectors, grouped=False):
+        """Run several selectors in a single traversal; see Document.querySelectorAllBatch."""
+        return _lx_select_batch(self.root, _LX_DOCUMENT, selectors, grouped)
+
+    # Create new element
+    def createElement(self, tag_name):
+        return _lx_wrap(self.root.makeelement(tag_name, {}))
+
+    # JS-like shortcuts
+    @property
+    def body(self):
+        el = self.root.find("body")
+        return _lx_wrap(el) if el is not None else None
+
+    @property
+    def head(self):
+        el = self.root.find("head")
+        return _lx_wrap(el) if el is not None else None
+
+    # ----------------- document.title -----------------
+    @property
+    def title(self):
+        el = self.root.find(".//title")
+        return el.text_content() if el is not None else ""
+
+    @title.setter
+    def title(self, value):
+        el = self.root.find(".//title")
+        if el is None:
+            head = self.root.find("head")
+            if head is None:
+                head = self.root.makeelement("head", {})
+                self.root.insert(0, head)
+            el = self.root.makeelement("title", {})
+            head.append(el)
+        for child in list(el):
+            el.remove(child)
+        el.text = value
+
+    # ----------------- getElementsByName -----------------
+    def getElementsByName(self, name):
+        return [_lx_wrap(el) for el in self.root.xpath("//*[@name=$n]", n=name)]
+
+    # ----------------- document.write -----------------
+    def write(self, html_str):
+        """Writes HTML into the document body, replacing existing content."""
+        body = self.root.find("body")
+        if body is None:
+            body = self.root.makeelement("body", {})
+            self.root.append(body)
+        _lx_wrap(body).innerHTML = html_str
 
+    def __str__(self):
+        return lxml.html.tostring(self.root, encoding="unicode")
@@ -0,0 +1,701 @@
+import copy
+import gc
+import pickle
+import weakref
+
+import bs4
+import pytest
+from bs4 import BeautifulSoup, SoupStrainer
+
+import pydom
+from pydom import Document
+
+BACKENDS = [
+    "bs4",
+    pytest.param("lxml", marks=pytest.mark.skipif(
+        pydom.lxml is None, reason="lxml backend needs lxml")),
+]
+
+HTML = (
+    "<html><head><title>T</title></head><body>"
+    "<nav id='nav' class='a b' style='color: red; margin: 0'></nav>"
+    "<div id='main' class='a'><p>1</p><section><p>2</p><span name='n'>s</span></section></div>"
+    "<ul><li>x</li><li class='z'>y</li><li>z</li></ul>"
+    "</body></html>"
+)
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param == "lxml":
+        pytest.importorskip("cssselect")
+    return request.param
+
+
+@pytest.fixture
+def doc(backend):
+    return Document(HTML, backend=backend)
+
+
+def name(el):
+    """Tag name of an Element or LxmlElement."""
+    tag = el.tag
+    return tag.tag if isinstance(getattr(tag, "tag", None), str) else tag.name
+
+
+def names(els):
+    return [name(el) for el in els]
+
+
+def inner(doc, selector):
+    return doc.querySelector(selector).innerHTML
+
+
+# ----------------- parsing -----------------
+def test_document_parser(monkeypatch):
+    assert pydom._PARSER == ("lxml" if pydom.lxml else "html.parser")
+    monkeypatch.setattr(pydom, "_PARSER", "html.parser")
+    doc = Document(HTML)
+    assert doc.getElementById("main").innerHTML == "<p>1</p><section><p>2</p><span name=\"n\">s</span></section>"
+
+
+# ----------------- selection -----------------
+def test_get_element_by_id(doc):
+    assert name(doc.getElementById("main")) == "div"
+    assert doc.getElementById("missing") is None
+
+
+def test_wrappers_are_shared(doc):
+    assert doc.getElementById("main") is doc.querySelector("div")
+    assert doc.querySelector("p").parentElement is doc.querySelector("div")
+
+
+def test_wrapper_cache_is_weak_and_keeps_tags_picklable(monkeypatch):
+    doc = Document(HTML)
+    nav = doc.getElementById("nav")
+    ref = weakref.ref(nav)
+    assert pickle.loads(pickle.dumps(nav.tag))["id"] == "nav"
+    del nav
+    gc.collect()
+    assert ref() is None
+    assert pydom._cached(doc.soup.nav) is None
+    monkeypatch.setattr(pydom, "_SWEEP_AT", 0)
+    li = doc.querySelector("li")
+    assert all(ref() is not None for ref in pydom._ELEMENT_REFS.values())
+    assert doc.querySelector("li") is li
+
+
+def test_get_elements_by(doc):
+    assert names(doc.getElementsByClassName("a")) == ["nav", "div"]
+    assert len(doc.getElementsByTagName("p")) == 2
+    assert names(doc.getElementsByTagName("*"))[:3] == ["html", "head", "title"]
+    assert names(doc.getElementsByName("n")) == ["span"]
+
+
+def test_get_elements_by_tag_name_star_skips_text(backend):
+    doc = Document("<html><body>a<!-- c --><p>b<i>c</i></p>d</body></html>", backend=backend)
+    assert names(doc.getElementsByTagName("*")) == ["html", "body", "p", "i"]
+    doc.querySelector("p").append("<b></b>")
+    assert names(doc.getElementsByTagName("*"))[2:] == ["p", "i", "b"]
+
+
+def test_query_selector(doc):
+    assert doc.querySelector("section > p").textContent == "2"
+    assert names(doc.querySelectorAll("li + li")) == ["li", "li"]
+    assert doc.querySelector("article") is None
+
+
+def test_element_query_sees_ancestors(doc):
+    main = doc.getElementById("main")
+    assert main.querySelector("body p").textContent == "1"
+    assert names(main.querySelectorAll("*")) == ["p", "section", "p", "span"]
+    assert main.querySelector("div") is None
+
+
+def test_query_selector_all_batch(doc):
+    assert names(doc.querySelectorAllBatch(["li.z", "nav"])) == ["nav", "li"]
+    groups = doc.querySelectorAllBatch(["p", "span", "article"], grouped=True)
+    assert [len(group) for group in groups] == [2, 1, 0]
+    assert doc.querySelectorAllBatch([]) == []
+
+
+def test_selector_cache():
+    pydom.clear_selector_cache()
+    doc = Document(HTML)
+    assert len(doc.querySelectorAll("li.z")) == 1
+    assert doc.querySelector("li.z") is not None
+    info = pydom._compile_sel.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+    pydom.clear_selector_cache()
+    assert pydom._compile_sel.cache_info().currsize == 0
+
+
+def test_query_selector_all_batch_overlapping(doc):
+    assert len(doc.querySelectorAllBatch(["li", "li.z"])) == 3
+    lis, zs = doc.querySelectorAllBatch(["li", ".z"], grouped=True)
+    assert zs[0] is lis[1]
+    main = doc.getElementById("main")
+    assert names(main.querySelectorAllBatch(["span", "p"])) == ["p", "p", "span"]
+    assert main.querySelectorAllBatch(["li"], grouped=True) == [[]]
+
+
+# ----------------- traversal -----------------
+def test_matches(doc):
+    p = doc.querySelector("section p")
+    assert p.matches("div > section > p")
+    assert p.matches("body p")
+    assert not p.matches("nav p")
+
+
+def test_matches_tests_only_the_element(doc):
+    main = doc.getElementById("main")
+    assert main.matches("#main.a")
+    assert main.matches("ul, div")
+    assert not main.matches("p")
+    assert doc.querySelector("li.z").matches("ul > li:nth-child(2)")
+
+
+def test_closest(doc):
+    p = doc.querySelector("section p")
+    assert p.closest("p") is p
+    assert p.closest("div.a") is doc.getElementById("main")
+    assert p.closest("ul") is None
+
+
+def test_closest_walks_up_to_the_root(doc):
+    html = doc.querySelector("html")
+    assert doc.querySelector("span").closest("html") is html
+    assert html.closest("body") is None
+    assert doc.querySelector("li").closest(":root") is html
+
+
+def test_contains(doc):
+    main = doc.getElementById("main")
+    span = doc.querySelector("span")
+    assert main.contains(span)
+    assert not span.contains(main)
+    assert not main.contains(main)
+
+
+def test_contains_detached_and_other_types(doc):
+    main = doc.getElementById("main")
+    orphan = doc.createElement("p")
+    assert not main.contains(orphan)
+    assert not doc.querySelector("ul").contains(doc.querySelector("span"))
+    main.appendChild(orphan)
+    assert main.contains(orphan) and doc.body.contains(orphan)
+    with pytest.raises(TypeError):
+        main.contains("p")
+
+
+def test_children(doc):
+    assert names(doc.querySelector("ul").children) == ["li", "li", "li"]
+
+
+def test_children_skip_text_and_comments(backend):
+    doc = Document("<html><body><ul> a <li>1</li><!-- c --><li>2</li> b </ul></body></html>",
+                   backend=backend)
+    ul = doc.querySelector("ul")
+    assert [li.textContent for li in ul.children] == ["1", "2"]
+    assert ul.children[0] is doc.querySelector("li")
+
+
+# ----------------- content -----------------
+def test_inner_html_roundtrip(doc):
+    nav = doc.getElementById("nav")
+    nav.innerHTML = "lead<h1>a</h1>mid<h2>b</h2>tail"
+    assert nav.innerHTML == "lead<h1>a</h1>mid<h2>b</h2>tail"
+    assert nav.textContent == "leadamidbtail"
+
+
+def test_inner_html_serializes_mixed_content():
+    doc = Document("<html><body><div>a<br><p class='x'>b</p>c</div></body></html>")
+    div = doc.querySelector("div")
+    assert div.innerHTML == 'a<br/><p class="x">b</p>c'
+    assert div.innerHTML == "".join(str(child) for child in div.tag.contents)
+    assert inner(doc, "br") == ""
+
+
+def test_inner_html_keeps_script_text(backend):
+    doc = Document("<html><head><script>if (a < b) {}</script></head><body></body></html>",
+                   backend=backend)
+    script = doc.querySelector("script")
+    assert script.innerHTML == "if (a < b) {}"
+    script.innerHTML = script.innerHTML
+    assert script.innerHTML == "if (a < b) {}"
+
+
+def test_text_content_setter(doc):
+    main = doc.getElementById("main")
+    main.textContent = "plain"
+    assert main.innerHTML == "plain"
+
+
+def test_inner_html_cache_tracks_descendants(doc):
+    body = doc.body
+    before = body.innerHTML
+    doc.querySelector("span").addClass("new")
+    assert body.innerHTML != before
+    assert 'class="new"' in body.innerHTML
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda doc: doc.querySelector("span").setAttribute("title", "t"),
+    lambda doc: setattr(doc.querySelector("span"), "style", {"top": "0"}),
+    lambda doc: doc.querySelector("span").classList.append("c"),
+    lambda doc: setattr(doc.querySelector("span"), "textContent", "t"),
+    lambda doc: doc.querySelector("span").insertAdjacentHTML("afterend", "<b></b>"),
+    lambda doc: doc.querySelector("span").remove(),
+    lambda doc: doc.querySelector("li").appendChild(doc.querySelector("span")),
+])
+def test_inner_html_cache_is_invalidated(mutate):
+    doc = Document(HTML)
+    body, main = doc.body, doc.getElementById("main")
+    before = body.innerHTML, main.innerHTML
+    assert body.innerHTML is before[0]
+    mutate(doc)
+    assert body.innerHTML != before[0]
+    assert main.innerHTML != before[1]
+    assert main.innerHTML == "".join(map(str, main.tag.contents))
+
+
+# ----------------- insertion -----------------
+def test_insert_adjacent_html_positions(backend):
+    doc = Document("<html><body><div>a<p>x</p>b</div></body></html>", backend=backend)
+    p = doc.querySelector("p")
+    for position in ["beforebegin", "afterbegin", "beforeend", "afterend"]:
+        p.insertAdjacentHTML(position, f"[{position[0]}]<i>{position[0]}</i>")
+    assert inner(doc, "div") == (
+        "a[b]<i>b</i><p>[a]<i>a</i>x[b]<i>b</i></p>[a]<i>a</i>b"
+    )
+    with pytest.raises(ValueError):
+        p.insertAdjacentHTML("nowhere", "<b></b>")
+
+
+def test_fragments_keep_sibling_order(backend):
+    doc = Document("<html><body><div></div></body></html>", backend=backend)
+    div = doc.querySelector("div")
+    div.insertAdjacentHTML("afterbegin", "")
+    assert div.innerHTML == ""
+    div.insertAdjacentHTML("afterbegin", "<i>1</i>2<i>3</i>")
+    div.insertAdjacentHTML("afterbegin", "<b>0</b>")
+    div.append("4<b>5</b>")
+    assert div.innerHTML == "<b>0</b><i>1</i>2<i>3</i>4<b>5</b>"
+    assert len(div.children) == 4
+
+
+def test_append_and_prepend_text(doc):
+    ul = doc.querySelector("ul")
+    ul.append("<li>4</li><li>5</li>")
+    ul.prependText("<li>0</li><li>00</li>")
+    assert [li.textContent for li in ul.children] == ["0", "00", "x", "y", "z", "4", "5"]
+
+
+def test_append_child_moves_node_and_keeps_text(backend):
+    doc = Document("<html><body><div>a<b>x</b>c</div><p></p></body></html>", backend=backend)
+    doc.querySelector("p").appendChild(doc.querySelector("b"))
+    assert inner(doc, "div") == "ac"
+    assert inner(doc, "p") == "<b>x</b>"
+
+
+def test_prepend(doc):
+    ul = doc.querySelector("ul")
+    ul.prepend(doc.createElement("li"))
+    assert len(ul.children) == 4
+    assert ul.children[0].textContent == ""
+
+
+def test_insert_before_and_replace_child(doc):
+    section = doc.querySelector("section")
+    span = doc.querySelector("span")
+    b = doc.createElement("b")
+    section.insertBefore(b, span)
+    assert names(section.children) == ["p", "b", "span"]
+    i = doc.createElement("i")
+    section.replaceChild(i, b)
+    assert names(section.children) == ["p", "i", "span"]
+    with pytest.raises(ValueError):
+        section.insertBefore(doc.createElement("a"), doc.querySelector("li"))
+
+
+def test_insert_before_and_replace_child_keep_text(backend):
+    doc = Document("<html><body><div>a<b>1</b>c<i>2</i>e</div></body></html>", backend=backend)
+    div = doc.querySelector("div")
+    b, i = doc.querySelector("b"), doc.querySelector("i")
+    div.insertBefore(i, b)
+    assert div.innerHTML == "a<i>2</i><b>1</b>ce"
+    div.replaceChild(doc.createElement("u"), i)
+    assert div.innerHTML == "a<u></u><b>1</b>ce"
+    with pytest.raises(TypeError):
+        div.replaceChild("<u></u>", b)
+
+
+def test_insert_adjacent_element(doc):
+    nav = doc.getElementById("nav")
+    nav.insertAdjacentElement("afterend", doc.createElement("hr"))
+    assert names(doc.body.children) == ["nav", "hr", "div", "ul"]
+
+
+def test_remove(doc):
+    doc.querySelector("span").remove()
+    assert doc.querySelector("span") is None
+    assert inner(doc, "section") == "<p>2</p>"
+
+
+def test_clone_node(doc):
+    main = doc.getElementById("main")
+    deep = main.cloneNode()
+    assert deep.innerHTML == main.innerHTML
+    assert deep.parentElement is None
+    deep.addClass("copy")
+    assert "copy" not in main.classList
+    assert main.cloneNode(deep=False).innerHTML == ""
+
+
+def test_copy_self_lookup_follows_bs4_version():
+    version = tuple(int(part) for part in bs4.__version__.split(".")[:2])
+    assert (pydom._COPY_SELF is not None) == (version >= (4, 13))
+
+
+@pytest.mark.parametrize("copy_self", [pydom._COPY_SELF, None], ids=["installed", "pre-4.13"])
+def test_clone_node_bs4_paths(monkeypatch, copy_self):
+    monkeypatch.setattr(pydom, "_COPY_SELF", copy_self)
+    doc = Document(HTML)
+    main = doc.getElementById("main")
+    main.querySelector("span").addClass("s")
+    deep = main.cloneNode()
+    deep.addClass("copy")
+    deep.querySelector("span").addClass("copy")
+    assert main.classList == ["a"]
+    assert doc.querySelector("span").classList == ["s"]
+    shallow = main.cloneNode(deep=False)
+    shallow.addClass("copy")
+    assert shallow.innerHTML == ""
+    assert main.classList == ["a"]
+
+
+# ----------------- classes / style / attributes -----------------
+def test_class_list(doc):
+    nav = doc.getElementById("nav")
+    nav.addClass("c")
+    assert nav.classList == ["a", "b", "c"]
+    nav.removeClass("a")
+    assert nav.classList == ["b", "c"]
+
+
+def test_class_list_edits_write_back(doc):
+    body = doc.body
+    body.innerHTML
+    nav = doc.getElementById("nav")
+    nav.classList.append("live")
+    assert nav.classList == ["a", "b", "live"]
+    assert 'class="a b live"' in body.innerHTML
+    nav.classList.clear()
+    assert nav.classList == []
+    assert "live" not in body.innerHTML
+
+
+def test_class_list_view_stays_live(doc):
+    nav = doc.getElementById("nav")
+    classes = nav.classList
+    nav.addClass("x")
+    classes.append("y")
+    assert nav.classList == ["a", "b", "x", "y"]
+    nav.setAttribute("class", "p")
+    classes += ["q"]
+    assert classes == ["p", "q"]
+    assert "q" in classes and len(classes) == 2
+    del classes[0]
+    assert nav.classList == ["q"]
+
+
+def test_class_from_string_attribute(doc):
+    li = doc.querySelector("li")
+    li.setAttribute("class", "p q")
+    li.addClass("r")
+    assert li.classList == ["p", "q", "r"]
+
+
+def test_reading_classes_keeps_inner_html_cache():
+    doc = Document(HTML)
+    li = doc.querySelector("li")
+    li.setAttribute("class", "p q")
+    body = doc.body
+    cached = body.innerHTML
+    assert li.classList == ["p", "q"]
+    assert "q" in li.classList
+    assert body.innerHTML is cached
+
+
+def test_class_attribute_added_and_dropped(doc):
+    li = doc.querySelector("li")
+    assert li.classList == []
+    li.removeClass("missing")
+    li.addClass("only")
+    assert 'class="only"' in doc.querySelector("ul").innerHTML
+    li.removeClass("only")
+    assert li.getAttribute("class") is None
+    assert doc.querySelector("ul").innerHTML.startswith("<li>x</li>")
+
+
+def test_style(doc):
+    nav = doc.getElementById("nav")
+    assert nav.style == {"color": "red", "margin": "0"}
+    nav.style = {"color": "blue"}
+    nav.style = {"padding": "1px"}
+    assert nav.getAttribute("style") == "color: blue; margin: 0; padding: 1px"
+
+
+def test_style_is_parsed_on_first_access(doc):
+    nav = doc.getElementById("nav")
+    assert nav._style is None
+    assert nav.style["color"] == "red"
+    assert nav.style is nav._style
+    li = doc.querySelector("li")
+    assert li.style == {}
+    assert li.getAttribute("style") is None
+
+
+def test_style_value_with_colon(backend):
+    doc = Document("<html><body><p style='background: url(http://x/y.png)'></p></body></html>",
+                   backend=backend)
+    assert doc.querySelector("p").style == {"background": "url(http://x/y.png)"}
+
+
+def test_style_attribute_edge_cases(backend):
+    doc = Document("<html><body><p style=''></p><i style=' color : red ;; '></i><b></b></body></html>",
+                   backend=backend)
+    assert doc.querySelector("p").style == {}
+    assert doc.querySelector("i").style == {"color": "red"}
+    b = doc.querySelector("b")
+    assert b.style == {}
+    assert inner(doc, "body").endswith("<b></b>")
+
+
+def test_set_attribute_style_resets_parsed_style(doc):
+    nav = doc.getElementById("nav")
+    nav.style
+    nav.setAttribute("style", "top: 1px")
+    assert nav.style == {"top": "1px"}
+
+
+def test_style_writes_are_deferred_until_read():
+    doc = Document(HTML)
+    nav = doc.getElementById("nav")
+    nav.style = {"color": "blue"}
+    nav.style = {"top": "0"}
+    assert nav.tag["style"] == "color: red; margin: 0"
+    assert doc.querySelector("[style*=top]") is nav
+    assert nav.tag["style"] == "color: blue; margin: 0; top: 0"
+    nav.style = {"top": "1px"}
+    assert nav.getAttribute("style") == "color: blue; margin: 0; top: 1px"
+    nav.style = {"top": "2px"}
+    assert "top: 2px" in str(doc.soup)
+
+
+def test_pending_style_is_weak_and_written_when_collected():
+    doc = Document(HTML)
+    nav = doc.getElementById("nav")
+    nav.style = {"color": "blue"}
+    ref = weakref.ref(nav)
+    del nav
+    gc.collect()
+    assert ref() is None
+    assert not pydom._DIRTY_STYLES
+    assert doc.soup.nav["style"] == "color: blue; margin: 0"
+
+
+def test_set_soup():
+    doc = Document(HTML)
+    assert doc.getElementById("main") is not None
+    doc.soup = BeautifulSoup("<html><body><p id='main'>new</p></body></html>", "html.parser")
+    assert doc.getElementById("main").textContent == "new"
+    assert len(doc.getElementsByTagName("p")) == 1
+    doc.body.append("<p>2</p>")
+    assert len(doc.getElementsByTagName("p")) == 2
+
+
+# ----------------- events -----------------
+def test_events(doc):
+    calls = []
+
+    class Handler:
+        def on(self, value):
+            calls.append(value)
+
+    handler = Handler()
+    nav = doc.getElementById("nav")
+    nav.addEventListener("click", handler.on)
+    nav.triggerEvent("click", 1)
+    nav.removeEventListener("click", handler.on)
+    nav.triggerEvent("click", 2)
+    assert calls == [1]
+
+
+def test_listeners_dedupe_and_remove_during_dispatch(doc):
+    calls = []
+    nav = doc.getElementById("nav")
+
+    def once():
+        calls.append("once")
+        nav.removeEventListener("click", once)
+
+    def always():
+        calls.append("always")
+
+    nav.addEventListener("click", once)
+    nav.addEventListener("click", always)
+    nav.addEventListener("click", always)
+    nav.triggerEvent("click")
+    nav.triggerEvent("click")
+    nav.removeEventListener("other", always)
+    assert calls == ["once", "always", "always"]
+
+
+def test_unhashable_listeners(doc):
+    calls = []
+
+    class Listener:
+        def __init__(self, tag):
+            self.tag = tag
+
+        def __eq__(self, other):
+            return isinstance(other, Listener) and other.tag == self.tag
+
+        def __call__(self):
+            calls.append(self.tag)
+
+    nav = doc.getElementById("nav")
+    nav.addEventListener("click", Listener("a"))
+    nav.addEventListener("click", Listener("a"))
+    nav.addEventListener("click", Listener("b"))
+    nav.triggerEvent("click")
+    nav.removeEventListener("click", Listener("a"))
+    nav.triggerEvent("click")
+    assert calls == ["a", "b", "b"]
+
+
+# ----------------- document -----------------
+def test_title(doc):
+    assert doc.title == "T"
+    doc.title = "U"
+    assert doc.title == "U"
+
+
+def test_write(doc):
+    doc.write("<p>w1</p>t<p>w2</p>")
+    assert doc.body.innerHTML == "<p>w1</p>t<p>w2</p>"
+    assert doc.getElementById("main") is None
+
+
+def test_lookups_follow_mutations(doc):
+    assert len(doc.getElementsByTagName("li")) == 3
+    doc.querySelector("ul").append("<li id='new'>4</li>")
+    assert len(doc.getElementsByTagName("li")) == 4
+    assert doc.getElementById("new").textContent == "4"
+    doc.getElementById("new").setAttribute("id", "renamed")
+    assert doc.getElementById("new") is None
+    assert doc.getElementById("renamed").textContent == "4"
+
+
+def test_get_element_by_id_returns_first_in_document_order(doc):
+    assert doc.getElementById("main").textContent == "12s"
+    dup = doc.createElement("b")
+    dup.setAttribute("id", "main")
+    doc.body.prepend(dup)
+    assert doc.getElementById("main") is dup
+    doc.querySelector("li").setAttribute("id", "nav")
+    assert name(doc.getElementById("nav")) == "nav"
+    doc.getElementById("nav").remove()
+    assert name(doc.getElementById("nav")) == "li"
+
+
+@pytest.mark.parametrize("html", ["", "  ", "<!-- c -->"])
+def test_document_without_elements(backend, html):
+    doc = Document(html, backend=backend)
+    assert doc.querySelector("p") is None
+    doc.write("<p>w</p>")
+    assert doc.body.innerHTML == "<p>w</p>"
+
+
+def test_document_with_encoding_declaration(backend):
+    doc = Document("<?xml version='1.0' encoding='iso-8859-1'?><html><body><p>\u00e9</p></body></html>",
+                   backend=backend)
+    assert doc.querySelector("p").textContent == "\u00e9"
+
+
+# ----------------- bs4 only -----------------
+def test_only_strainer():
+    assert str(Document(HTML, only="nav").soup).startswith("<nav")
+    assert names(Document(HTML, only=["LI"]).querySelectorAll("li")) == ["li", "li", "li"]
+    assert Document(HTML, only=".z").querySelector("li").textContent == "y"
+    with pytest.raises(TypeError):
+        Document(HTML, only=3)
+
+
+def test_only_forms():
+    assert Document(HTML, only="#main").getElementById("main").querySelector("span") is not None
+    assert Document(HTML, only="#main").querySelector("nav") is None
+    assert names(Document(HTML, only="nav, UL").querySelectorAll("nav, ul")) == ["nav", "ul"]
+    assert Document(HTML, only={"name": "li", "class_": "z"}).querySelector("li").textContent == "y"
+    assert len(Document(HTML, only=SoupStrainer("p")).querySelectorAll("p")) == 2
+    # Anything else parses the whole document
+    assert Document(HTML, only="div > p").title == "T"
+    with pytest.raises(TypeError):
+        Document(HTML, only=["li", 3])
+    with pytest.raises(ValueError):
+        Document(HTML, only="nav", backend="lxml")
+
+
+def test_id_index_survives_non_structural_mutations():
+    doc = Document(HTML)
+    nav = doc.getElementById("nav")
+    index = doc._id_cache
+    nav.setAttribute("title", "t")
+    nav.addClass("c")
+    nav.style = {"top": "0"}
+    assert doc.getElementById("nav") is nav
+    assert doc._id_cache is index
+    nav.append("<b id='b'></b>")
+    assert doc._id_cache is None
+    assert name(doc.getElementById("b")) == "b"
+
+
+def test_tag_index_dropped_only_by_structural_mutations():
+    doc = Document(HTML)
+    shared = copy.copy(doc)
+    assert len(doc.getElementsByTagName("li")) == 3
+    assert len(shared.getElementsByTagName("li")) == 3
+    index = doc._tag_index
+    doc.querySelector("li").setAttribute("title", "t")
+    doc.querySelector("li").addClass("c")
+    assert doc.getElementsByTagName("li")[0].getAttribute("title") == "t"
+    assert doc._tag_index is index
+    other = Document(HTML)
+    other.getElementsByTagName("li")
+    doc.querySelector("ul").append("<li>4</li>")
+    assert len(doc.getElementsByTagName("li")) == 4
+    assert len(shared.getElementsByTagName("li")) == 4
+    assert other._tag_index is not None
+    assert len(doc.getElementsByTagName(["li", "nav"])) == 5
+
+
+def test_copy_and_pickle():
+    doc = Document(HTML)
+    doc.getElementsByTagName("p")
+    for clone in (copy.copy(doc), copy.deepcopy(doc), pickle.loads(pickle.dumps(doc))):
+        assert type(clone) is Document
+        assert clone.getElementById("main") is not None
+        assert len(clone.getElementsByTagName("p")) == 2
+
+
+def test_use_lxml_backend():
+    pytest.importorskip("lxml")
+    pydom.use_lxml_backend()
+    try:
+        assert isinstance(Document(HTML), pydom.LxmlDocument)
+    finally:
+        pydom.use_lxml_backend(False)
+    assert type(Document(HTML)) is Document
+    with pytest.raises(ValueError):
+        Document(HTML, backend="other")